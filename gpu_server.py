@@ -1,20 +1,35 @@
 from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, PrivateAttr
 from typing import Dict, List, Optional
 import uvicorn
 from datetime import datetime
 import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 import logging
+import os
+import sys
 import aiohttp
 import threading
 import json
+import time
+import orjson
+from collections import defaultdict, Counter
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging; default to INFO and let deployments opt into DEBUG
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# orjson's C encoder is several times faster than the stdlib json module,
+# which matters on a proxy that mostly shuffles JSON payloads around
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Bound every stage of a forwarded request: a hung downstream client must
+# not pin the coroutine (and its payload) until the OS resets the socket
+PREDICT_TIMEOUT = aiohttp.ClientTimeout(total=120, connect=2.0, sock_connect=2.0, sock_read=60.0)
+
+# How many distinct clients a single /predict is allowed to try
+MAX_FORWARD_ATTEMPTS = 3
 
 # Add CORS middleware
 app.add_middleware(
@@ -35,6 +50,25 @@ class GPUClient(BaseModel):
     status: str
     capabilities: Dict
 
+    # Cached set view of loaded_models so membership tests in the
+    # /predict hot path are O(1) instead of O(len(loaded_models))
+    _loaded_models_set: frozenset = PrivateAttr(default_factory=frozenset)
+    # Monotonic stamp of the last heartbeat: liveness checks compare this
+    # against time.monotonic() instead of parsing the ISO timestamp string
+    _hb_mono: float = PrivateAttr(default=0.0)
+
+    def model_post_init(self, __context) -> None:
+        self.refresh_loaded_models_set()
+        self._hb_mono = time.monotonic()
+
+    def touch_heartbeat(self):
+        self._hb_mono = time.monotonic()
+
+    def refresh_loaded_models_set(self):
+        # Intern the model names: there are only a handful of distinct model
+        # types, so membership tests collapse to pointer comparisons
+        self._loaded_models_set = frozenset(sys.intern(m) for m in self.loaded_models)
+
     def get_last_heartbeat(self) -> datetime:
         return datetime.fromisoformat(self.last_heartbeat)
 
@@ -49,47 +83,161 @@ class PredictionRequest(BaseModel):
     image_url: Optional[str] = None    # URL of the image
 
 class ClientRegistry:
+    """Registry of connected GPU clients.
+
+    Clients are partitioned by hash(client_id) across NUM_SHARDS
+    copy-on-write dicts, each with its own writer lock: writers on
+    different shards don't serialize against each other, and each write
+    copies only its shard instead of the whole registry. Readers grab the
+    current shard dicts and iterate those snapshots -- no lock, so
+    heartbeats and /predict never contend on reads.
+
+    The secondary indexes (_by_model, _gpu_capable, _inflight, _cb) stay
+    global: they are mutated without any await in between, which is atomic
+    with respect to the single-threaded event loop.
+    """
+    NUM_SHARDS = 16
+
     def __init__(self):
-        self.clients: Dict[str, GPUClient] = {}
+        self._shard_maps: List[Dict[str, GPUClient]] = [{} for _ in range(self.NUM_SHARDS)]
+        self._shard_locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(self.NUM_SHARDS)]
         self.heartbeat_timeout = 3  # seconds
-        self._lock = asyncio.Lock()  # Lock for client registration/updates
-        self._search_lock = asyncio.Lock()  # Separate lock for client search
-        self._cleanup_lock = asyncio.Lock()  # Lock for cleanup operations
+        # Circuit breaker state: client_id -> (consecutive failures, open_until)
+        self._cb: Dict[str, tuple] = {}
+        self.cb_failure_threshold = 3
+        self.cb_open_seconds = 15.0
+        # Reverse indexes maintained on writes so find_best_client is a dict
+        # lookup instead of a scan over every client's model list
+        self._by_model: Dict[str, set] = defaultdict(set)
+        self._gpu_capable: set = set()
+        # Estimated load per client: in-flight /predict forwards. Used to
+        # pick the least-loaded candidate instead of the first match
+        self._inflight: Counter = Counter()
+        # Rate limit for the clients table so log volume doesn't scale with
+        # the heartbeat rate
+        self._last_print = 0.0
+        self.print_interval = 5.0
         logger.info("Initialized ClientRegistry")
 
+    def _shard_of(self, client_id: str) -> int:
+        return hash(client_id) & (self.NUM_SHARDS - 1)
+
+    def _get_client(self, client_id: str) -> Optional[GPUClient]:
+        return self._shard_maps[self._shard_of(client_id)].get(client_id)
+
+    def total_clients(self) -> int:
+        return sum(len(shard) for shard in self._shard_maps)
+
+    @property
+    def clients(self) -> Dict[str, GPUClient]:
+        """Merged snapshot of all shards (read-only view for display paths)"""
+        merged: Dict[str, GPUClient] = {}
+        for shard in self._shard_maps:
+            merged.update(shard)
+        return merged
+
+    def acquire_slot(self, client_id: str):
+        """Mark a forward to a client as in flight"""
+        self._inflight[client_id] += 1
+
+    def release_slot(self, client_id: str):
+        """Mark a forward to a client as finished"""
+        if self._inflight[client_id] > 0:
+            self._inflight[client_id] -= 1
+
+    def _is_active(self, client: GPUClient) -> bool:
+        return time.monotonic() - client._hb_mono < self.heartbeat_timeout
+
+    def _index_client(self, client: GPUClient):
+        """Update the model and GPU-capability indexes for a client"""
+        client_id = client.client_id
+        for members in self._by_model.values():
+            members.discard(client_id)
+        for model in client._loaded_models_set:
+            self._by_model[model].add(client_id)
+
+        gpu_info = client.gpu_info
+        if gpu_info and gpu_info.get("device_name") and gpu_info.get("total_memory", 0) > 0:
+            self._gpu_capable.add(client_id)
+        else:
+            self._gpu_capable.discard(client_id)
+
+    def _deindex_client(self, client_id: str):
+        for members in self._by_model.values():
+            members.discard(client_id)
+        self._gpu_capable.discard(client_id)
+        # Reclaim the per-client breaker and load state too: reconnecting
+        # clients arrive under fresh ids, so stale entries would otherwise
+        # accumulate forever
+        self._cb.pop(client_id, None)
+        self._inflight.pop(client_id, None)
+
+    def _breaker_open(self, client_id: str) -> bool:
+        """Check whether the circuit breaker for a client is currently open"""
+        return self._cb.get(client_id, (0, 0.0))[1] > time.monotonic()
+
+    def record_failure(self, client_id: str):
+        """Record a failed forward to a client; open its breaker after
+        cb_failure_threshold consecutive failures."""
+        failures = self._cb.get(client_id, (0, 0.0))[0] + 1
+        open_until = 0.0
+        if failures >= self.cb_failure_threshold:
+            open_until = time.monotonic() + self.cb_open_seconds
+            logger.warning(f"Circuit breaker opened for client {client_id} "
+                           f"after {failures} consecutive failures")
+        self._cb[client_id] = (failures, open_until)
+
+    def record_success(self, client_id: str):
+        """Record a successful forward to a client, closing its breaker"""
+        self._cb.pop(client_id, None)
+
     async def register_client(self, client: GPUClient):
-        async with self._lock:
+        shard_idx = self._shard_of(client.client_id)
+        async with self._shard_locks[shard_idx]:
             logger.info(f"Registering new client: {client.client_id}")
-            logger.debug(f"Client details: {client.dict()}")
-            
-            # If client already exists, update its information
-            if client.client_id in self.clients:
+            # Guarded so the .dict() copy is only paid when DEBUG is on
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Client details: %s", client.dict())
+
+            if client.client_id in self._shard_maps[shard_idx]:
                 logger.info(f"Client {client.client_id} already exists, updating information")
-                existing_client = self.clients[client.client_id]
-                for key, value in client.dict().items():
-                    setattr(existing_client, key, value)
-                self.clients[client.client_id] = existing_client
-            else:
-                self.clients[client.client_id] = client
-                
+
+            # Copy-on-write: swap in a new shard dict so readers keep a
+            # stable snapshot
+            new_shard = dict(self._shard_maps[shard_idx])
+            new_shard[client.client_id] = client
+            self._shard_maps[shard_idx] = new_shard
+            self._index_client(client)
+
             logger.info(f"Successfully registered/updated client: {client.client_id} at {client.ip_address}:{client.port}")
-            logger.info(f"Total clients: {len(self.clients)}")
+            logger.info(f"Total clients: {self.total_clients()}")
 
     async def update_client(self, client_id: str, update_data: Dict) -> bool:
         try:
-            async with self._lock:
-                logger.info(f"Updating client: {client_id}")
-                logger.debug(f"Update data: {update_data}")
-                
-                if client_id in self.clients:
-                    client = self.clients[client_id]
+            shard_idx = self._shard_of(client_id)
+            async with self._shard_locks[shard_idx]:
+                logger.info("Updating client: %s", client_id)
+                logger.debug("Update data: %s", update_data)
+
+                shard = self._shard_maps[shard_idx]
+                if client_id in shard:
+                    client = shard[client_id]
                     for key, value in update_data.items():
                         setattr(client, key, value)
+                    if "loaded_models" in update_data:
+                        client.refresh_loaded_models_set()
+                    if "loaded_models" in update_data or "gpu_info" in update_data:
+                        self._index_client(client)
+                    client.touch_heartbeat()
                     logger.info(f"Successfully updated client: {client_id}")
                     return True
                 else:
-                    # Create new client from update data
-                    new_client = GPUClient(
+                    # Create new client from update data, filling in defaults
+                    # for any fields the heartbeat payload didn't carry.
+                    # model_construct skips validation: this data is built
+                    # server-side, and the untrusted /register entrypoint
+                    # still validates in full
+                    new_client = GPUClient.model_construct(
                         client_id=client_id,
                         ip_address=update_data.get("ip_address", "unknown"),
                         port=update_data.get("port", 8000),
@@ -99,7 +247,11 @@ class ClientRegistry:
                         status=update_data.get("status", "active"),
                         capabilities=update_data.get("capabilities", {})
                     )
-                    await self.register_client(new_client)
+                    new_shard = dict(shard)
+                    new_shard[client_id] = new_client
+                    self._shard_maps[shard_idx] = new_shard
+                    self._index_client(new_client)
+                    logger.info(f"Registered new client from heartbeat: {client_id}")
                     return True
 
         except Exception as e:
@@ -107,131 +259,195 @@ class ClientRegistry:
             return False
 
     async def remove_client(self, client_id: str):
-        async with self._cleanup_lock:
+        shard_idx = self._shard_of(client_id)
+        async with self._shard_locks[shard_idx]:
             logger.info(f"Removing client: {client_id}")
-            if client_id in self.clients:
-                del self.clients[client_id]
+            if client_id in self._shard_maps[shard_idx]:
+                new_shard = dict(self._shard_maps[shard_idx])
+                del new_shard[client_id]
+                self._shard_maps[shard_idx] = new_shard
+                self._deindex_client(client_id)
                 logger.info(f"Successfully removed client: {client_id}")
-                logger.info(f"Remaining clients: {len(self.clients)}")
+                logger.info(f"Remaining clients: {self.total_clients()}")
             else:
                 logger.warning(f"Client not found for removal: {client_id}")
 
-    async def get_active_clients(self) -> List[GPUClient]:
-        """Get list of active clients without modifying the registry"""
-        current_time = datetime.now()
+    def _collect_active_clients(self) -> List[GPUClient]:
+        """Collect active clients without taking any lock.
+
+        Safe to call from paths that already hold a registry lock: it only
+        reads a point-in-time copy of the clients dict.
+        """
+        now = time.monotonic()
         active_clients = []
-        
-        # Create a copy of the clients dictionary to avoid modification during iteration
-        clients_copy = dict(self.clients)
-        
-        for client_id, client in clients_copy.items():
-            try:
-                time_diff = (current_time - client.get_last_heartbeat()).seconds
-                if time_diff < self.heartbeat_timeout:
+
+        # Grab the current shard dicts; writers swap in new dicts rather
+        # than mutating these, so iteration is safe without a copy
+        for shard in self._shard_maps:
+            for client in shard.values():
+                if now - client._hb_mono < self.heartbeat_timeout:
                     active_clients.append(client)
-            except Exception as e:
-                logger.error(f"Error processing client {client_id}: {str(e)}")
-        
+
         return active_clients
 
+    async def get_active_clients(self) -> List[GPUClient]:
+        """Get list of active clients without modifying the registry"""
+        return self._collect_active_clients()
+
     async def cleanup_inactive_clients(self):
-        """Separate method to clean up inactive clients"""
-        async with self._cleanup_lock:
-            current_time = datetime.now()
-            clients_to_remove = []
-            
-            # Create a copy of the clients dictionary
-            clients_copy = dict(self.clients)
-            
-            for client_id, client in clients_copy.items():
-                try:
-                    time_diff = (current_time - client.get_last_heartbeat()).seconds
-                    if time_diff >= self.heartbeat_timeout:
-                        clients_to_remove.append(client_id)
-                        logger.info(f"Marking client {client_id} for removal due to timeout")
-                except Exception as e:
-                    logger.error(f"Error checking client {client_id} for cleanup: {str(e)}")
+        """Separate method to clean up inactive clients.
+
+        Only run from the periodic background task; the scan itself is a
+        lock-free snapshot read and removals take the writer lock.
+        """
+        # Monotonic deadlines: timedelta.seconds truncated sub-day precision
+        # and wrapped on clock skew, and parsing the ISO timestamp cost a
+        # datetime.fromisoformat per client per sweep
+        now = time.monotonic()
+        clients_to_remove = []
+
+        # Read the current shard snapshots; removals below swap in new dicts
+        for shard in self._shard_maps:
+            for client_id, client in shard.items():
+                if now - client._hb_mono >= self.heartbeat_timeout:
                     clients_to_remove.append(client_id)
-            
-            # Remove inactive clients
-            for client_id in clients_to_remove:
-                await self.remove_client(client_id)
-            
+                    logger.info(f"Marking client {client_id} for removal due to timeout")
+
+        # Remove inactive clients
+        for client_id in clients_to_remove:
+            await self.remove_client(client_id)
+
+        if clients_to_remove:
             logger.info(f"Cleanup completed. Removed {len(clients_to_remove)} inactive clients")
 
     async def get_client_by_id(self, client_id: str) -> Optional[GPUClient]:
-        async with self._lock:
-            if client_id in self.clients:
-                logger.info(f"Found client: {client_id}")
-                return self.clients[client_id]
-            logger.warning(f"Client not found: {client_id}")
-            return None
+        # Lock-free snapshot read
+        client = self._get_client(client_id)
+        if client:
+            logger.info(f"Found client: {client_id}")
+            return client
+        logger.warning(f"Client not found: {client_id}")
+        return None
+
+    async def find_best_client(self, model_type: str,
+                               exclude: Optional[set] = None) -> Optional[GPUClient]:
+        """Find the best available client for the requested model type.
 
-    async def find_best_client(self, model_type: str) -> Optional[GPUClient]:
-        """Find the best available client for the requested model type"""
+        Args:
+            exclude: client ids already tried for this request; skipped so a
+                     retry never re-selects a client that just failed.
+        """
         try:
-            async with self._search_lock:
-                logger.info(f"Starting client search for model: {model_type}")
-                active_clients = await self.get_active_clients()
-                logger.info(f"Found {len(active_clients)} active clients")
-                
-                if not active_clients:
-                    logger.warning("No active clients found")
-                    return None
-                
-                # First try to find a client that already has the model loaded
-                for client in active_clients:
-                    logger.debug(f"Checking client {client.client_id} with models: {client.loaded_models}")
-                    if model_type in client.loaded_models:
-                        logger.info(f"Found client {client.client_id} with model {model_type} already loaded")
-                        return client
-                
-                # If no client has the model loaded, find any client with GPU capabilities
-                for client in active_clients:
-                    if client.status == "active":
-                        # Check if client has GPU capabilities
-                        gpu_info = client.gpu_info
-                        if gpu_info and gpu_info.get("device_name") and gpu_info.get("total_memory", 0) > 0:
-                            logger.info(f"Selected client {client.client_id} with GPU: {gpu_info.get('device_name')}")
-                            return client
-                
-                logger.warning("No suitable client with GPU capabilities found")
-                return None
-                
+            # Search is read-only over a point-in-time copy, so no lock is
+            # needed; taking one here just serialized /predict against itself
+            logger.info(f"Starting client search for model: {model_type}")
+            exclude = exclude or ()
+
+            # First try clients that already have the model loaded, via the
+            # reverse index maintained on register/update; among those pick
+            # the one with the fewest in-flight forwards so a single fast
+            # worker doesn't absorb every job
+            candidates = [
+                client for client_id in self._by_model.get(model_type, ())
+                if client_id not in exclude
+                and (client := self._get_client(client_id)) and self._is_active(client)
+                and not self._breaker_open(client_id)
+            ]
+            if candidates:
+                client = min(candidates, key=lambda c: self._inflight[c.client_id])
+                logger.info(f"Found client {client.client_id} with model {model_type} already loaded "
+                            f"({self._inflight[client.client_id]} in flight)")
+                return client
+
+            # If no client has the model loaded, fall back to the least-loaded
+            # active GPU-capable client
+            candidates = [
+                client for client_id in self._gpu_capable
+                if client_id not in exclude
+                and (client := self._get_client(client_id)) and client.status == "active"
+                and self._is_active(client) and not self._breaker_open(client_id)
+            ]
+            if candidates:
+                client = min(candidates, key=lambda c: self._inflight[c.client_id])
+                logger.info(f"Selected client {client.client_id} with GPU: {client.gpu_info.get('device_name')}")
+                return client
+
+            logger.warning("No suitable client with GPU capabilities found")
+            return None
+
         except Exception as e:
             logger.error(f"Error in find_best_client: {str(e)}")
             return None
 
     async def print_clients_table(self):
-        """Print a formatted table of all connected clients"""
-        async with self._lock:
-            current_time = datetime.now()
-            logger.info("\n=== Connected Clients Table ===")
-            logger.info(f"Total Clients: {len(self.clients)}")
-            logger.info(f"Current Time: {current_time}")
-            logger.info("-" * 100)
-            logger.info(f"{'Client ID':<36} {'IP Address':<15} {'Port':<6} {'Status':<8} {'Last Heartbeat':<20} {'Models':<30}")
-            logger.info("-" * 100)
-            
-            for client_id, client in self.clients.items():
-                try:
-                    time_diff = (current_time - client.get_last_heartbeat()).seconds
-                    status = "active" if time_diff < self.heartbeat_timeout else "inactive"
-                    models_str = ", ".join(client.loaded_models[:2]) + ("..." if len(client.loaded_models) > 2 else "")
-                    logger.info(f"{client_id:<36} {client.ip_address:<15} {client.port:<6} {status:<8} {client.last_heartbeat:<20} {models_str:<30}")
-                except Exception as e:
-                    logger.error(f"Error formatting client {client_id}: {str(e)}")
-            logger.info("-" * 100 + "\n")
+        """Print a formatted table of all connected clients.
+
+        Rate-limited: with N clients heartbeating every few seconds, printing
+        on every heartbeat emits O(N) lines per heartbeat per client.
+        """
+        if time.monotonic() - self._last_print < self.print_interval:
+            return
+        self._last_print = time.monotonic()
+
+        # Format from a lock-free snapshot; never hold the registry lock
+        # while emitting log lines
+        snapshot = self.clients
+        current_time = datetime.now()
+        logger.info("\n=== Connected Clients Table ===")
+        logger.info(f"Total Clients: {len(snapshot)}")
+        logger.info(f"Current Time: {current_time}")
+        logger.info("-" * 100)
+        logger.info(f"{'Client ID':<36} {'IP Address':<15} {'Port':<6} {'Status':<8} {'Last Heartbeat':<20} {'Models':<30}")
+        logger.info("-" * 100)
+
+        now = time.monotonic()
+        for client_id, client in snapshot.items():
+            try:
+                status = "active" if now - client._hb_mono < self.heartbeat_timeout else "inactive"
+                models_str = ", ".join(client.loaded_models[:2]) + ("..." if len(client.loaded_models) > 2 else "")
+                logger.info(f"{client_id:<36} {client.ip_address:<15} {client.port:<6} {status:<8} {client.last_heartbeat:<20} {models_str:<30}")
+            except Exception as e:
+                logger.error(f"Error formatting client {client_id}: {str(e)}")
+        logger.info("-" * 100 + "\n")
 
 # Create global registry
 registry = ClientRegistry()
 
+async def _cleanup_loop():
+    """Sweep inactive clients at a fixed rate, independent of request rate"""
+    interval = registry.heartbeat_timeout / 2
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await registry.cleanup_inactive_clients()
+        except Exception as e:
+            logger.error(f"Error in cleanup loop: {str(e)}")
+
+@app.on_event("startup")
+async def startup_event():
+    # One pooled session for all downstream forwards: keeps connections to
+    # GPU clients warm instead of paying a TCP handshake per /predict
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, limit_per_host=32, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(total=30)
+    )
+    app.state.cleanup_task = asyncio.create_task(_cleanup_loop())
+    logger.info("Created shared aiohttp session and cleanup task")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.cleanup_task.cancel()
+    await app.state.http.close()
+    logger.info("Closed shared aiohttp session and cancelled cleanup task")
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f"Received {request.method} request to {request.url}")
-    response = await call_next(request)
-    logger.info(f"Response status: {response.status_code}")
-    return response
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Received %s request to %s", request.method, request.url)
+        response = await call_next(request)
+        logger.info("Response status: %s", response.status_code)
+        return response
+    return await call_next(request)
 
 @app.post("/register")
 async def register_client(client: GPUClient):
@@ -255,73 +471,51 @@ async def client_heartbeat(client_id: str, update_data: Dict, request: Request):
         if "last_heartbeat" not in update_data:
             update_data["last_heartbeat"] = datetime.now().isoformat()
             
-        # Add client IP and port from request
-        client_host = request.client.host if request.client else "unknown"
-        client_port = request.client.port if request.client else 8000
-        
-        # Add required fields if missing
-        update_data.setdefault("ip_address", client_host)
-        update_data.setdefault("port", client_port)
-        update_data.setdefault("gpu_info", {})
-        update_data.setdefault("capabilities", {})
-        
-        # Try to update the client
+        # Add client IP and port from request; update_client fills in the
+        # remaining defaults and re-registers on a registry miss
+        update_data.setdefault("ip_address", request.client.host if request.client else "unknown")
+        update_data.setdefault("port", request.client.port if request.client else 8000)
+
         success = await registry.update_client(client_id, update_data)
-        if success:
-            # Print the updated clients table
-            await registry.print_clients_table()
-            return {"status": "success", "message": "Heartbeat received"}
-        
-        # If update failed, try to register the client
-        try:
-            new_client = GPUClient(
-                client_id=client_id,
-                ip_address=client_host,
-                port=client_port,
-                gpu_info=update_data.get("gpu_info", {}),
-                loaded_models=update_data.get("loaded_models", []),
-                last_heartbeat=update_data.get("last_heartbeat", datetime.now().isoformat()),
-                status=update_data.get("status", "active"),
-                capabilities=update_data.get("capabilities", {})
-            )
-            await registry.register_client(new_client)
-            # Print the updated clients table after registration
-            await registry.print_clients_table()
-            return {"status": "success", "message": "Client re-registered"}
-        except Exception as e:
-            logger.error(f"Error re-registering client: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
-            
+        if not success:
+            raise HTTPException(status_code=500, detail="Failed to process heartbeat")
+
+        # Print the updated clients table
+        await registry.print_clients_table()
+        return {"status": "success", "message": "Heartbeat received"}
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing heartbeat: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/clients")
+@app.get("/clients", response_model=None)
 async def get_clients():
     logger.info("Received request for client list")
     try:
-        # First get the list of active clients
+        # Inactive clients are swept by the periodic background task, so
+        # this is a pure read
         active_clients = await registry.get_active_clients()
         logger.info(f"Returning {len(active_clients)} active clients")
-        
-        # Then run cleanup in the background
-        asyncio.create_task(registry.cleanup_inactive_clients())
-        
-        return {
-            "active_clients": active_clients,
-            "total_clients": len(registry.clients)
-        }
+
+        # Serialize directly with orjson to skip FastAPI's response_model
+        # validation and the stdlib json encoder
+        return ORJSONResponse({
+            "active_clients": [c.model_dump(mode="json") for c in active_clients],
+            "total_clients": registry.total_clients()
+        })
     except Exception as e:
         logger.error(f"Error getting clients: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/clients/{client_id}")
+@app.get("/clients/{client_id}", response_model=None)
 async def get_client(client_id: str):
     logger.info(f"Received request for client: {client_id}")
     try:
         client = await registry.get_client_by_id(client_id)
         if client:
-            return client
+            return ORJSONResponse(client.model_dump(mode="json"))
         raise HTTPException(status_code=404, detail="Client not found")
     except Exception as e:
         logger.error(f"Error getting client: {str(e)}")
@@ -341,14 +535,17 @@ async def remove_client(client_id: str):
 async def predict(request: Request):
     """Handle prediction requests and route them to appropriate clients"""
     try:
-        # Get raw request data
-        request_data = await request.json()
-        logger.info(f"Received prediction request data: {request_data}")
+        # Decode the raw body with orjson instead of the stdlib parser
+        request_data = orjson.loads(await request.body())
+        # Payloads can carry multi-MB base64 images; only format them at DEBUG
+        logger.debug("Received prediction request data: %s", request_data)
         
         # Extract required fields with defaults
         model_type = request_data.get("model_type")
         if not model_type:
             raise HTTPException(status_code=400, detail="model_type is required")
+        # Intern to match the interned model names in the registry indexes
+        model_type = sys.intern(model_type)
             
         model_cid = request_data.get("model_cid", "")
         prompt = request_data.get("prompt", "")
@@ -359,23 +556,9 @@ async def predict(request: Request):
         image_url = request_data.get("image_url")
         
         logger.info(f"Processing request for model: {model_type}")
-        
-        # Find the best available client with timeout
-        try:
-            client = await asyncio.wait_for(registry.find_best_client(model_type), timeout=5.0)
-        except asyncio.TimeoutError:
-            logger.error("Timeout while finding best client")
-            raise HTTPException(status_code=503, detail="Timeout while finding suitable client")
-            
-        if not client:
-            logger.error("No suitable client found")
-            raise HTTPException(status_code=503, detail="No suitable client available")
-        
-        # Forward the request to the selected client
-        client_url = f"http://{client.ip_address}:{client.port}/predict"
-        logger.info(f"Forwarding request to client: {client_url}")
-        
-        # Prepare the request data
+
+        # Prepare the request data once; the body is parsed a single time
+        # and reused across retries
         forward_data = {
             "model_type": model_type,
             "model_cid": model_cid,
@@ -386,48 +569,86 @@ async def predict(request: Request):
             "image_data": image_data,
             "image_url": image_url
         }
-        
-        # If we have image data, ensure it's properly formatted
-        if forward_data.get("image_data"):
-            # Ensure the base64 data is properly formatted
-            if not forward_data["image_data"].startswith("data:image/"):
-                forward_data["image_data"] = f"data:image/jpeg;base64,{forward_data['image_data']}"
-        
-        logger.info(f"Forwarding data to client: {forward_data}")
-        
-        # Add timeout to the client request
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(client_url, json=forward_data, timeout=30.0) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        logger.info(f"Successfully received response from client {client.client_id}")
-                        return result
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Client returned error: {response.status} - {error_text}")
-                        # If client returns error, try to find another client
-                        logger.info("Attempting to find another client...")
-                        client = await registry.find_best_client(model_type)
-                        if client and client.client_id != client.client_id:
-                            return await predict(request)  # Retry with new client
-                        raise HTTPException(status_code=response.status, detail=error_text)
-            except asyncio.TimeoutError:
-                logger.error(f"Timeout while waiting for client {client.client_id} response")
-                raise HTTPException(status_code=504, detail="Client request timeout")
-                
+
+        # If we have image data, ensure it's properly formatted; the slice
+        # compare avoids startswith's method dispatch on a multi-MB string
+        if image_data and image_data[:11] != "data:image/":
+            forward_data["image_data"] = f"data:image/jpeg;base64,{image_data}"
+
+        logger.debug("Forwarding data to client: %s", forward_data)
+
+        return await _forward(request.app.state.http, model_type, forward_data)
+
     except json.JSONDecodeError as e:
         logger.error(f"Invalid JSON in request: {str(e)}")
         raise HTTPException(status_code=400, detail="Invalid JSON in request")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
-        # If request fails, try to find another client
-        logger.info("Attempting to find another client...")
-        client = await registry.find_best_client(model_type)
-        if client and client.client_id != client.client_id:
-            return await predict(request)  # Retry with new client
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _forward(session: aiohttp.ClientSession, model_type: str, forward_data: dict,
+                   retries: int = MAX_FORWARD_ATTEMPTS):
+    """Forward a prediction to the best client, retrying over distinct clients.
+
+    Bounded and iterative: the old recursive retry re-entered the handler
+    with an already-consumed request body and could recurse without limit.
+    """
+    # Encode once: the payload can carry a multi-MB base64 image, so
+    # re-serializing it on every retry would mean one large allocation each
+    body = orjson.dumps(forward_data)
+    headers = {"Content-Type": "application/json"}
+
+    tried: set = set()
+    last_error = HTTPException(status_code=503, detail="No suitable client available")
+
+    for _ in range(retries):
+        try:
+            client = await asyncio.wait_for(
+                registry.find_best_client(model_type, exclude=tried), timeout=5.0)
+        except asyncio.TimeoutError:
+            logger.error("Timeout while finding best client")
+            raise HTTPException(status_code=503, detail="Timeout while finding suitable client")
+
+        if not client:
+            logger.error("No suitable client found")
+            break
+
+        tried.add(client.client_id)
+        client_url = f"http://{client.ip_address}:{client.port}/predict"
+        logger.info(f"Forwarding request to client: {client_url}")
+
+        # Forward over the shared pooled session with the request timeout,
+        # accounting the in-flight forward for least-loaded selection
+        registry.acquire_slot(client.client_id)
+        try:
+            async with session.post(client_url, data=body, headers=headers,
+                                    timeout=PREDICT_TIMEOUT) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    registry.record_success(client.client_id)
+                    logger.info(f"Successfully received response from client {client.client_id}")
+                    return result
+                error_text = await response.text()
+                registry.record_failure(client.client_id)
+                logger.error(f"Client returned error: {response.status} - {error_text}")
+                last_error = HTTPException(status_code=response.status, detail=error_text)
+        except asyncio.TimeoutError:
+            registry.record_failure(client.client_id)
+            logger.error(f"Timeout while waiting for client {client.client_id} response")
+            last_error = HTTPException(status_code=504, detail="Client request timeout")
+        except aiohttp.ClientError as e:
+            registry.record_failure(client.client_id)
+            logger.error(f"Connection error forwarding to client {client.client_id}: {str(e)}")
+            last_error = HTTPException(status_code=502, detail=f"Client connection error: {str(e)}")
+        finally:
+            registry.release_slot(client.client_id)
+
+        logger.info("Attempting to find another client...")
+
+    raise last_error
+
 if __name__ == "__main__":
     logger.info("Starting server on http://0.0.0.0:8001")
     uvicorn.run(app, host="0.0.0.0", port=8001, log_level="debug") 
\ No newline at end of file
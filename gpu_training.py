@@ -1,4 +1,9 @@
+import asyncio
+import os
+import shutil
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from fastapi import FastAPI
 from config import CONTRACT, ACCOUNT, PRIVATE_KEY, PINATA_API_KEY, PINATA_SECRET_API_KEY
@@ -8,6 +13,32 @@ app = FastAPI()
 
 PINATA_UPLOAD_URL = "https://api.pinata.cloud/pinning/pinFileToIPFS"
 
+# Shared session so repeated IPFS downloads and Pinata uploads reuse the
+# same pooled TLS connections
+_http = requests.Session()
+
+# Transaction nonce is fetched from the chain once and incremented locally,
+# saving one RPC round-trip per training job
+_nonce = None
+_nonce_lock = threading.Lock()
+
+def _next_nonce():
+    """Return the next transaction nonce for ACCOUNT."""
+    global _nonce
+    with _nonce_lock:
+        if _nonce is None:
+            _nonce = CONTRACT.w3.eth.get_transaction_count(ACCOUNT)
+        nonce = _nonce
+        _nonce += 1
+        return nonce
+
+def _download_file(url, dest_path):
+    """Stream a remote file straight to disk without buffering it in RAM."""
+    with _http.get(url, stream=True) as response:
+        response.raise_for_status()
+        with open(dest_path, "wb") as f:
+            shutil.copyfileobj(response.raw, f, length=1 << 20)
+
 def upload_to_pinata(file_path):
     """Uploads file to Pinata (IPFS) and returns the CID."""
     headers = {
@@ -15,13 +46,16 @@ def upload_to_pinata(file_path):
         "pinata_secret_api_key": PINATA_SECRET_API_KEY
     }
     with open(file_path, "rb") as file:
-        response = requests.post(PINATA_UPLOAD_URL, headers=headers, files={"file": file})
+        response = _http.post(PINATA_UPLOAD_URL, headers=headers, files={"file": file})
     return response.json()["IpfsHash"]
 
-@app.post("/train_model/{job_id}")
-def train_model(job_id: int):
+# Training jobs can run for hours; give them their own small executor so
+# they never occupy slots in FastAPI's shared request threadpool
+train_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="train")
+
+def _do_train(job_id: int):
     """Fetch dataset, train model with DeepSpeed, upload results to Pinata, and update blockchain."""
-    
+
     # Fetch job details from smart contract
     job = CONTRACT.functions.jobs(job_id).call()
     model_cid = job[2]
@@ -31,32 +65,58 @@ def train_model(job_id: int):
     model_url = f"https://gateway.pinata.cloud/ipfs/{model_cid}"
     dataset_url = f"https://gateway.pinata.cloud/ipfs/{dataset_cid}"
 
-    # Download model and dataset from IPFS
+    # Download model and dataset from IPFS, streaming to disk so multi-GB
+    # datasets never sit fully in memory. Both downloads are network-bound,
+    # so run them concurrently: wall time is max(model, dataset), not the sum
     model_path = "model.pth"
     dataset_path = "dataset.csv"
 
-    with open(model_path, "wb") as model_file:
-        model_file.write(requests.get(model_url).content)
-
-    with open(dataset_path, "wb") as dataset_file:
-        dataset_file.write(requests.get(dataset_url).content)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        model_future = executor.submit(_download_file, model_url, model_path)
+        dataset_future = executor.submit(_download_file, dataset_url, dataset_path)
+        model_future.result()
+        dataset_future.result()
 
-    # Run DeepSpeed training instead of Horovod
-    command = "deepspeed --num_gpus=4 train.py"
-    subprocess.run(command, shell=True)
+    # Run DeepSpeed training instead of Horovod; argv form skips the shell
+    # and lets us pin the GPU set explicitly
+    subprocess.run(
+        ["deepspeed", "--num_gpus=4", "train.py"],
+        check=True,
+        env={**os.environ, "CUDA_VISIBLE_DEVICES": "0,1,2,3"}
+    )
 
     # Upload trained model to Pinata (IPFS)
     trained_model_cid = upload_to_pinata("trained_model.pth")
 
-    # Notify blockchain
+    # Notify blockchain over the contract's provider connection
+    w3 = CONTRACT.w3
     txn = CONTRACT.functions.completeJob(job_id, trained_model_cid).build_transaction({
         "from": ACCOUNT,
         "gas": 500000,
         "gasPrice": Web3.to_wei("10", "gwei"),
-        "nonce": Web3.eth.get_transaction_count(ACCOUNT)
+        "nonce": _next_nonce()
     })
 
-    signed_txn = Web3.eth.account.sign_transaction(txn, PRIVATE_KEY)
-    tx_hash = Web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+    signed_txn = w3.eth.account.sign_transaction(txn, PRIVATE_KEY)
+    tx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
 
     return {"trained_model_cid": trained_model_cid, "tx_hash": tx_hash.hex()}
+
+def _run_training_job(job_id: int):
+    try:
+        result = _do_train(job_id)
+        print(f"Training job {job_id} completed: {result}")
+    except Exception as e:
+        print(f"Training job {job_id} failed: {e}")
+
+@app.post("/train_model/{job_id}", status_code=202)
+async def train_model(job_id: int):
+    """Accept a training job and run it in the background.
+
+    Training takes hours, so the work is offloaded to a dedicated executor
+    and the job is acknowledged immediately; completion is reported
+    on-chain via completeJob.
+    """
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(train_executor, _run_training_job, job_id)
+    return {"status": "accepted", "job_id": job_id}
@@ -0,0 +1,518 @@
+"""Bundle a self-contained Python environment next to the release binaries.
+
+Builds a venv, installs PyTorch (CUDA build where available) plus the
+inference dependencies, and copies the interpreter and site-packages into
+target/release/python/ where the desktop client expects them (see
+get_python_home/get_python_path in src/client/manager.rs).
+
+Compiling transformers' Rust extensions can take 5-10 minutes, so built
+wheels are cached under wheels_cache/ and reused on later runs.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Progress bars are a nicety, not a dependency of the bundle itself
+try:
+    from rich.progress import Progress
+except ImportError:
+    Progress = None
+
+# Fallback copies (cross-device, or no native tool) move multi-hundred-MB
+# shared libraries; the default 64 KiB buffer leaves throughput on the table
+shutil.COPY_BUFSIZE = 1024 * 1024
+if hasattr(shutil, "_USE_CP_SENDFILE"):
+    # Keep the zero-copy os.sendfile path enabled for same-filesystem copies
+    shutil._USE_CP_SENDFILE = True
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+VENV_DIR = SCRIPT_DIR / "venv"
+WHEELS_CACHE = SCRIPT_DIR / "wheels_cache"
+RELEASE_DIR = SCRIPT_DIR / "target" / "release"
+
+PYTORCH_INDEX_URL = "https://download.pytorch.org/whl/cu124"
+
+# (package, version, description) for everything beyond torch
+OTHER_PACKAGES = [
+    ("transformers", "4.38.2", "HuggingFace transformers"),
+    ("diffusers", "0.32.2", "Stable Diffusion pipelines"),
+    ("accelerate", "1.5.2", "HuggingFace accelerate"),
+    ("pillow", "10.0.0", "image handling"),
+    ("numpy", "2.2.4", "numerics"),
+]
+
+
+# Serializes prints from concurrent install threads so logs don't interleave
+_print_lock = threading.Lock()
+
+# uv parallelizes resolution, download and extraction, and installs wheels
+# as hardlinks from its global cache -- an order of magnitude faster than
+# pip for a bundle this size. Not every build host has it, so every uv
+# path below keeps the pip equivalent as fallback.
+_UV = shutil.which("uv")
+
+
+def run_command(cmd, cwd=None, env=None):
+    """Run a command, streaming its output; returns True on success.
+
+    Output is teed line by line to stdout (so a verbose pip install shows
+    progress live instead of appearing all at once at the end) while only
+    a bounded tail is retained for failure reporting -- capture_output
+    would buffer the whole transcript, tens of MB for a torch install,
+    in memory.
+    """
+    with _print_lock:
+        print(f"Running: {' '.join(str(c) for c in cmd)}")
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, bufsize=1, text=True)
+    tail = deque(maxlen=200)
+
+    def _pump():
+        for line in proc.stdout:
+            tail.append(line)
+            with _print_lock:
+                print(line, end="")
+
+    reader = threading.Thread(target=_pump, daemon=True)
+    reader.start()
+    returncode = proc.wait()
+    reader.join()
+    if returncode != 0:
+        with _print_lock:
+            print(f"Command failed with exit code {returncode}; last output:")
+            print("".join(tail), end="")
+        return False
+    return True
+
+
+# Loop run inside the venv interpreter: one pip call per json line on stdin,
+# exit status reported back on a NUL-prefixed marker line so it cannot be
+# mistaken for pip's own output
+_DRIVER = """\
+import json, sys
+from pip._internal.cli.main import main
+for line in sys.stdin:
+    try:
+        rc = main(json.loads(line))
+    except SystemExit as exit_:
+        rc = exit_.code or 0
+    print("\\x00rc=%s" % rc, flush=True)
+"""
+
+
+class _PipDriver:
+    """Long-lived pip worker inside the venv interpreter.
+
+    A bundle run makes many pip invocations, each normally paying Python
+    interpreter cold-start (a few hundred ms on Windows). The driver
+    starts the venv's interpreter once and feeds it pip argv lists over
+    stdin instead. Calls are serialized through a lock; anything needing
+    a custom environment or failure isolation (wheel builds, the parallel
+    per-archive installs) still goes through run_command.
+    """
+
+    def __init__(self, python_cmd):
+        self._proc = subprocess.Popen(
+            [python_cmd, "-u", "-c", _DRIVER],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self._lock = threading.Lock()
+
+    def call(self, args):
+        """Run one pip command in the worker; returns True on success."""
+        args = [str(a) for a in args]
+        with self._lock:
+            with _print_lock:
+                print(f"pip {' '.join(args)}")
+            self._proc.stdin.write(json.dumps(args) + "\n")
+            self._proc.stdin.flush()
+            for line in self._proc.stdout:
+                if line.startswith("\x00rc="):
+                    return line.strip() == "\x00rc=0"
+                with _print_lock:
+                    print(line, end="")
+        return False  # worker died mid-command
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.stdin.close()
+            self._proc.wait()
+
+
+def get_python_cmd(venv_dir):
+    """Path to the venv's interpreter."""
+    if os.name == "nt":
+        return str(venv_dir / "Scripts" / "python.exe")
+    return str(venv_dir / "bin" / "python")
+
+
+def _fast_rmtree(path):
+    """Delete a tree, spreading the per-file unlinks across threads.
+
+    A populated venv or bundled site-packages is tens of thousands of
+    small files; a single-threaded rmtree serializes every unlink
+    syscall. On Windows the per-file cost is highest, and cmd's rmdir
+    beats Python doing the walk itself.
+    """
+    path = Path(path)
+    if os.name == "nt":
+        if subprocess.run(["cmd", "/c", "rmdir", "/S", "/Q", str(path)]).returncode == 0:
+            return
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                executor.submit(shutil.rmtree, entry.path, True)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def create_venv():
+    """Create a fresh venv for the bundle."""
+    if VENV_DIR.exists():
+        print("Removing existing venv...")
+        _fast_rmtree(VENV_DIR)
+    print("Creating venv...")
+    if _UV:
+        # --seed keeps pip available inside the venv for the wheel builds
+        return run_command([_UV, "venv", "--seed", str(VENV_DIR),
+                            "--python", sys.executable])
+    return run_command([sys.executable, "-m", "venv", str(VENV_DIR)])
+
+
+@functools.lru_cache(maxsize=1)
+def check_pytorch_cuda(python_cmd):
+    """Check whether the installed torch build can see CUDA.
+
+    Probes in the venv's interpreter and reads the answer from the exit
+    code, so the bundler never imports torch (and its CUDA libraries) into
+    its own process. Memoized: the probe re-initializes the CUDA runtime
+    each time, so repeat callers get the cached boolean.
+    """
+    result = subprocess.run(
+        [python_cmd, "-c",
+         "import torch, sys; sys.exit(0 if torch.cuda.is_available() else 1)"])
+    available = result.returncode == 0
+    print(f"PyTorch CUDA available: {available}")
+    return available
+
+
+@functools.lru_cache(maxsize=None)
+def _wheel_cache_key(package, version):
+    """Content-addressed cache key for a built wheel.
+
+    A built wheel is specific to the Python ABI, the architecture and (for
+    packages with Rust extensions) the Rust toolchain; a name-only cache
+    silently serves stale wheels across any of those changing.
+    """
+    try:
+        rustc = subprocess.check_output(["rustc", "--version"]).strip()
+    except (OSError, subprocess.CalledProcessError):
+        rustc = b"no-rustc"
+    raw = f"{package}{version}{sys.version_info[:2]}{platform.machine()}{rustc}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def check_cached_wheel(package, version):
+    """Return a previously built wheel for package==version, if cached."""
+    if not WHEELS_CACHE.exists():
+        return None
+    keyed_dir = WHEELS_CACHE / _wheel_cache_key(package, version)
+    wheels = sorted(keyed_dir.glob(f"{package}-{version}*.whl"))
+    if wheels:
+        return wheels[0]
+    # Pure-Python wheels cached at the top level predate the keyed layout
+    # and are ABI-independent, so still honor them
+    wheels = sorted(WHEELS_CACHE.glob(f"{package}-{version}-py3-none-any.whl"))
+    return wheels[0] if wheels else None
+
+
+def cache_wheel(python_cmd, package, version):
+    """Build a wheel for package==version into the cache directory."""
+    keyed_dir = WHEELS_CACHE / _wheel_cache_key(package, version)
+    keyed_dir.mkdir(parents=True, exist_ok=True)
+    # Reuse one cargo target dir across runs so a repeat Rust build is
+    # incremental instead of the full 5-10 minute compile
+    env = {**os.environ, "CARGO_TARGET_DIR": str(WHEELS_CACHE / "cargo_target")}
+    ok = run_command([python_cmd, "-m", "pip", "wheel", "--no-deps",
+                      "--wheel-dir", str(keyed_dir), f"{package}=={version}"],
+                     env=env)
+    return check_cached_wheel(package, version) if ok else None
+
+
+def _track(iterable, description, total):
+    """Yield from iterable behind a progress bar when rich is installed.
+
+    With several installs running concurrently, interleaved logs make it
+    hard to tell a stall from progress; one bar (or a plain counter when
+    rich is absent) shows completions as they land.
+    """
+    if Progress is None:
+        for done, item in enumerate(iterable, 1):
+            with _print_lock:
+                print(f"{description}: {done}/{total}")
+            yield item
+        return
+    with Progress() as progress:
+        task = progress.add_task(description, total=total)
+        for item in iterable:
+            progress.advance(task)
+            yield item
+
+
+def _installed_versions(python_cmd):
+    """Map of installed package name -> version from one pip list call.
+
+    One subprocess and one JSON parse covers every package; probing each
+    package's __version__ individually would pay an interpreter start and
+    a heavyweight import (PIL, transformers) per check.
+    """
+    out = subprocess.check_output([python_cmd, "-m", "pip", "list", "--format=json"])
+    return {p["name"].lower(): p["version"] for p in json.loads(out)}
+
+
+def pip_install(python_cmd, pip, args):
+    """Install into the venv via uv if present, else the pip worker."""
+    if _UV:
+        # uv skips bytecode compilation by default
+        return run_command([_UV, "pip", "install", "--python", python_cmd, *args])
+    return pip.call(["install", "--no-compile", *args])
+
+
+def install_transformers(python_cmd, pip):
+    """Install transformers from the wheel cache, building it once if needed."""
+    package, version, _ = OTHER_PACKAGES[0]
+    wheel = check_cached_wheel(package, version)
+    if not wheel:
+        print(f"No cached wheel for {package}=={version}, building (this can take a while)...")
+        wheel = cache_wheel(python_cmd, package, version)
+        if not wheel:
+            return False
+    print(f"Installing {package} from cached wheel: {wheel.name}")
+    return pip_install(python_cmd, pip, [str(wheel)])
+
+
+def install_remaining(python_cmd, pip, specs):
+    """Two-phase install of the batched dependency set.
+
+    One pip download resolves and fetches every wheel (pip parallelizes
+    the downloads internally); the installs then run concurrently from
+    local disk with --no-index/--no-deps, so the single-threaded zip
+    extraction -- the dominant install cost -- is spread across cores.
+    """
+    if _UV:
+        # uv already overlaps download and extraction internally; the
+        # manual two-phase split below only pays off for pip
+        return pip_install(python_cmd, pip, list(specs))
+
+    # Fresh per-run directory: leftovers from an earlier pin set would be
+    # picked up by the globs below and reinstalled nondeterministically
+    download_dir = WHEELS_CACHE / "downloads"
+    if download_dir.exists():
+        _fast_rmtree(download_dir)
+    download_dir.mkdir(parents=True)
+    if not pip.call(["download", "--prefer-binary",
+                     "--dest", str(download_dir), *specs]):
+        return False
+
+    # The resolver also fetches dependencies that are already satisfied:
+    # accelerate hard-depends on torch, so a generic PyPI torch wheel lands
+    # here and would silently clobber the cu124 build installed just
+    # before. Drop every archive whose distribution is already in the venv
+    installed = _installed_versions(python_cmd)
+
+    def _dist_name(archive):
+        if archive.name.endswith(".whl"):
+            name = archive.name.split("-")[0]
+        else:
+            name = archive.name[:-len(".tar.gz")].rsplit("-", 1)[0]
+        return name.lower().replace("_", "-")
+
+    archives = sorted(download_dir.glob("*.whl")) + sorted(download_dir.glob("*.tar.gz"))
+    archives = [a for a in archives if _dist_name(a) not in installed]
+
+    def _install(archive):
+        return run_command([python_cmd, "-m", "pip", "install",
+                            "--no-compile", "--no-deps", "--no-index",
+                            str(archive)])
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as executor:
+        results = _track(executor.map(_install, archives),
+                         "Installing wheels", len(archives))
+        return all(results)
+
+
+def install_packages(python_cmd, pip):
+    """Install torch and the inference dependencies into the venv."""
+    print("Installing PyTorch (CUDA build)...")
+    if not pip_install(python_cmd, pip,
+                       ["torch", "torchvision", "--index-url", PYTORCH_INDEX_URL]):
+        return False
+    check_pytorch_cuda(python_cmd)
+
+    # transformers (wheel cache, possibly a long Rust build with its own
+    # RUSTFLAGS env) runs on one thread while everything else resolves and
+    # downloads in a single batched pip invocation on another -- the work is
+    # network/compile bound, so the wall time is the slower of the two
+    remaining = [f"{pkg}=={ver}" if ver else pkg for pkg, ver, _ in OTHER_PACKAGES[1:]]
+    with _print_lock:
+        print(f"Installing: transformers (wheel cache) + {', '.join(remaining)}")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        transformers_future = executor.submit(install_transformers, python_cmd, pip)
+        batch_future = executor.submit(install_remaining, python_cmd, pip, remaining)
+        if not (transformers_future.result() and batch_future.result()):
+            return False
+
+    # One pip list verifies every pin before anything gets bundled
+    installed = _installed_versions(python_cmd)
+    for package, version, _ in OTHER_PACKAGES:
+        found = installed.get(package.lower())
+        if version and found != version:
+            print(f"Version mismatch for {package}: wanted {version}, got {found}")
+            return False
+    return True
+
+
+def _link_or_copy(src, dst):
+    """Hardlink src to dst, falling back to a byte copy across devices."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _prune_bytecode(root):
+    """Drop __pycache__ trees from a copied bundle."""
+    for pycache in Path(root).rglob("__pycache__"):
+        shutil.rmtree(pycache, ignore_errors=True)
+
+
+def _fast_copytree(src, dst):
+    """Copy a tree with the platform's native tool, falling back to shutil.
+
+    site-packages holds tens of thousands of small files; robocopy
+    multi-threads the per-file syscalls on Windows, cp -al hardlinks on
+    Linux (cp -a second, which uses the kernel copy_file_range/sendfile
+    paths), and cp -aR clones on APFS. shutil.copytree with the hardlink
+    copy function remains the portable fallback.
+    """
+    src, dst = Path(src), Path(dst)
+    if os.name == "nt" and shutil.which("robocopy"):
+        dst.mkdir(parents=True, exist_ok=True)
+        result = subprocess.run(
+            ["robocopy", str(src), str(dst), f"/MT:{os.cpu_count() or 8}",
+             "/E", "/XD", "__pycache__", "/XF", "*.pyc",
+             "/NFL", "/NDL", "/NJH", "/NJS"])
+        if result.returncode <= 7:  # robocopy exit codes below 8 mean success
+            return
+        print("robocopy failed, falling back to shutil.copytree...")
+    elif shutil.which("cp"):
+        dst.mkdir(parents=True, exist_ok=True)
+        flag_sets = (["-al"], ["-a"]) if sys.platform.startswith("linux") else (["-aR"],)
+        for flags in flag_sets:
+            if subprocess.run(["cp", *flags, f"{src}/.", str(dst)]).returncode == 0:
+                _prune_bytecode(dst)
+                return
+        print("cp failed, falling back to shutil.copytree...")
+    shutil.copytree(src, dst, copy_function=_link_or_copy, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+
+
+def _bundle_signature(python_cmd):
+    """Digest of the venv's resolved package set.
+
+    The venv is rebuilt from scratch every run, so file mtimes (and each
+    dist-info's RECORD) change even when nothing upgrades; a stat-based
+    tree hash would never match across runs. The resolved name==version
+    set plus the interpreter version and architecture is stable whenever
+    the inputs are, which is exactly when the copy can be skipped.
+    """
+    installed = _installed_versions(python_cmd)
+    pins = "\n".join(f"{name}=={version}" for name, version in sorted(installed.items()))
+    raw = f"{pins}\n{sys.version_info[:3]}|{platform.machine()}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def copy_python_env(venv_dir, target_dir):
+    """Copy the venv's interpreter and site-packages into the bundle."""
+    python_dir = target_dir / "python"
+    if os.name == "nt":
+        site_packages_src = venv_dir / "Lib" / "site-packages"
+    else:
+        lib_dirs = sorted((venv_dir / "lib").glob("python*"))
+        site_packages_src = lib_dirs[0] / "site-packages"
+    site_packages_dst = python_dir / "site-packages"
+
+    # Skip the whole wipe-and-copy when the venv resolves to the same
+    # package set as the last bundle -- on a rebuild-only run that's the
+    # entire copy step
+    sig_file = python_dir / ".bundle_sig"
+    signature = _bundle_signature(get_python_cmd(venv_dir))
+    if sig_file.exists() and sig_file.read_text() == signature:
+        print("Bundled python is up to date, skipping copy")
+        return True
+
+    if python_dir.exists():
+        print("Removing existing bundled python...")
+        _fast_rmtree(python_dir)
+    python_dir.mkdir(parents=True)
+
+    # Hardlink/native-copy instead of copying bytes in Python: a CUDA torch
+    # install is 5+ GB and mostly small files. The venv's bytecode caches
+    # are not copied; the bundle gets its own fresh ones below
+    print(f"Copying site-packages to {site_packages_dst}...")
+    _fast_copytree(site_packages_src, site_packages_dst)
+
+    # Installs run with --no-compile (the serial per-file .pyc write
+    # dominated install time for torch/transformers); compile the shipped
+    # tree here instead, once, across all cores, so the client's first
+    # import doesn't pay it
+    print("Byte-compiling bundled site-packages...")
+    run_command([get_python_cmd(venv_dir), "-m", "compileall",
+                 "-q", "-j", "0", str(site_packages_dst)])
+
+    if os.name == "nt":
+        # The embedded interpreter needs the DLLs and python.exe next to it.
+        # NTFS hardlinks make these zero-byte copies when target/ sits on
+        # the same volume as the venv; _link_or_copy falls back otherwise
+        scripts_dir = venv_dir / "Scripts"
+        for file in [*scripts_dir.glob("python*.dll"), scripts_dir / "python.exe"]:
+            _link_or_copy(file, python_dir / file.name)
+
+    # Written last, so an interrupted copy never claims to be current
+    sig_file.write_text(signature)
+    print("Python environment bundled")
+    return True
+
+
+def main():
+    if not create_venv():
+        sys.exit(1)
+
+    python_cmd = get_python_cmd(VENV_DIR)
+    pip = _PipDriver(python_cmd)
+    try:
+        if not install_packages(python_cmd, pip):
+            sys.exit(1)
+    finally:
+        pip.close()
+
+    print("Building release binaries...")
+    if not run_command(["cargo", "build", "--release"], cwd=SCRIPT_DIR):
+        sys.exit(1)
+
+    if not copy_python_env(VENV_DIR, RELEASE_DIR):
+        sys.exit(1)
+
+    print("Release bundle complete")
+
+
+if __name__ == "__main__":
+    main()